@@ -0,0 +1,135 @@
+"""Admission control and load shedding for expensive AI endpoints.
+
+Each endpoint gets its own concurrency limit and a bounded wait queue. When
+both are full, or a queued request waits too long, the request is rejected
+immediately with 503 and a `Retry-After` derived from the recently observed
+service time, instead of piling up inside the worker.
+
+Admission runs as ASGI middleware keyed by path, so a rejected request is
+answered before its (often multi-megabyte) body is read or parsed.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from fastapi.responses import JSONResponse
+
+from config import get_settings
+
+settings = get_settings()
+
+# Weight of the newest sample in the service-time moving average.
+SERVICE_TIME_ALPHA = 0.2
+INITIAL_SERVICE_TIME_SECONDS = 5.0
+
+PATH_PREFIX = "/gemini/"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the Retry-After seconds."""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class EndpointLimiter:
+    """Concurrency limit with a bounded queue for a single endpoint."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queued: int, max_wait_seconds: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_wait_seconds = max_wait_seconds
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self.service_time = INITIAL_SERVICE_TIME_SECONDS
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new request."""
+        backlog = self.queued + 1
+        return max(1, math.ceil(self.service_time * backlog / self.max_concurrent))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(f"{reason}. Please retry shortly.", self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold a slot for the duration of the block, or raise AdmissionRejected."""
+        # Counted synchronously so a burst arriving in one tick is still bounded.
+        if self.queued >= self.max_queued + max(0, self.max_concurrent - self.active):
+            raise self._reject(f"The {self.name} service is at capacity")
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            raise self._reject(f"Timed out waiting for the {self.name} service")
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self.service_time += SERVICE_TIME_ALPHA * (elapsed - self.service_time)
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "maxConcurrent": self.max_concurrent,
+            "maxQueued": self.max_queued,
+            "serviceTimeSeconds": round(self.service_time, 3)
+        }
+
+
+_limiters: dict[str, EndpointLimiter] = {
+    name: EndpointLimiter(name, max_concurrent, max_queued, settings.admission_max_wait_seconds)
+    for name, (max_concurrent, max_queued) in settings.admission_limits.items()
+}
+
+
+def get_limiter(name: str) -> EndpointLimiter:
+    return _limiters[name]
+
+
+class AdmissionMiddleware:
+    """Admit POST /gemini/<endpoint> requests through that endpoint's limiter."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"].startswith(PATH_PREFIX):
+            limiter = _limiters.get(scope["path"][len(PATH_PREFIX):].rstrip("/"))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with limiter.admit():
+                await self.app(scope, receive, send)
+        except AdmissionRejected as rejected:
+            response = JSONResponse(
+                {"detail": rejected.detail},
+                status_code=503,
+                headers={"Retry-After": str(rejected.retry_after)}
+            )
+            await response(scope, receive, send)
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
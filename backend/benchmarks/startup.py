@@ -0,0 +1,115 @@
+"""Startup-time benchmark for the FixIt API.
+
+Measures, in fresh interpreters:
+  - import: time to `import main`
+  - first_request: time from launching uvicorn until `/health` answers
+
+Runs against a throwaway SQLite database so it never touches fixit.db.
+
+Usage (from backend/):
+    python benchmarks/startup.py [--runs 5] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(db_path: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    return env
+
+
+def measure_import(db_path: str) -> float:
+    """Seconds spent importing the app module."""
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=_env(db_path),
+        text=True
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_request(db_path: str, timeout_seconds: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until /health returns 200."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=_env(db_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout_seconds:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before /health responded")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not respond within {timeout_seconds}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure FixIt API import and first-request latency.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    import_samples: list[float] = []
+    request_samples: list[float] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            # A fresh database per run so schema creation is included.
+            db_path = os.path.join(tmp, f"bench-{run}.db")
+            import_samples.append(measure_import(db_path))
+            request_samples.append(measure_first_request(db_path))
+
+    results = {
+        "runs": args.runs,
+        "import": _summary(import_samples),
+        "first_request": _summary(request_samples)
+    }
+    print(json.dumps(results, indent=2))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,19 @@
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 
+# [max concurrent, max queued] per /gemini endpoint.
+# A single analysis fires one highlight image and then one image per step at
+# once, so generate-step-image admits at least REPAIR_STEP_IMAGE_BURST.
+REPAIR_STEP_IMAGE_BURST = 6
+DEFAULT_ADMISSION_LIMITS: dict[str, tuple[int, int]] = {
+    "analyze": (4, 8),
+    "manual": (4, 8),
+    "generate-step-image": (3, 9),
+    "troubleshoot": (4, 8),
+    "moderate": (8, 16),
+}
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -16,6 +29,33 @@ class Settings(BaseSettings):
         "https://fixit-tool.vercel.app",
     ]
     
+    # Create missing tables on startup; disable when running `python repairs_cli.py init-db` as a deploy step
+    auto_create_schema: bool = True
+    
+    # Admission control for /gemini endpoints; entries override DEFAULT_ADMISSION_LIMITS
+    admission_limits: dict[str, tuple[int, int]] = DEFAULT_ADMISSION_LIMITS
+    admission_max_wait_seconds: float = 30.0
+    
+    # Step illustration cache
+    illustration_cache_dir: str = "./illustration_cache"
+    illustration_cache_max_bytes: int = 512 * 1024 * 1024
+    illustration_cost_usd: float = 0.039  # Billed price of one generated image, for saved-spend stats
+    
+    # Moderation batching
+    moderation_batch_size: int = 8
+    moderation_batch_wait_ms: int = 50
+    moderation_timeout_seconds: float = 20.0
+    moderation_memory_cache_size: int = 10000
+    
+    @field_validator("admission_limits")
+    @classmethod
+    def merge_admission_limits(cls, value: dict[str, tuple[int, int]]) -> dict[str, tuple[int, int]]:
+        """Apply overrides on top of the defaults so every endpoint keeps a limit."""
+        for name, (max_concurrent, max_queued) in value.items():
+            if max_concurrent < 1 or max_queued < 0:
+                raise ValueError(f"{name}: max concurrent must be >= 1 and max queued >= 0")
+        return {**DEFAULT_ADMISSION_LIMITS, **value}
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import get_settings
 
@@ -21,3 +22,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(db):
+    """Return the dialect-specific insert() that supports ON CONFLICT upserts."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise ValueError(f"Upserts are not supported for the {dialect} dialect")
+
+
+def init_db():
+    """Create missing tables and backfill derived data."""
+    import models  # noqa: F401  (registers tables on Base.metadata)
+    import facets
+    
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        facets.ensure_backfilled(db)
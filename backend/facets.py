@@ -0,0 +1,203 @@
+"""Precomputed feed aggregates and category facets.
+
+Counts per (category, is_public, outcome) and per (category, object_name) are
+adjusted inside the same transaction as every repair write, so reading the
+facets never touches the `repairs` table.
+"""
+
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from database import dialect_insert
+from models import Repair, RepairCountAggregate, ObjectNameAggregate
+
+OUTCOME_SUCCESSFUL = "successful"
+OUTCOME_FAILED = "failed"
+OUTCOME_UNKNOWN = "unknown"
+
+DEFAULT_TOP_OBJECTS = 5
+MAX_TOP_OBJECTS = 50
+
+# (category, is_public, outcome, object_name)
+FacetKey = tuple[str, bool, str, str]
+
+
+def _outcome(is_successful: Optional[bool]) -> str:
+    if is_successful is None:
+        return OUTCOME_UNKNOWN
+    return OUTCOME_SUCCESSFUL if is_successful else OUTCOME_FAILED
+
+
+def facet_key(category: str, is_public: Optional[bool], is_successful: Optional[bool], object_name: str) -> FacetKey:
+    """Build the aggregate key a repair contributes to."""
+    return (category, bool(is_public), _outcome(is_successful), object_name)
+
+
+def repair_facet_key(repair: Repair) -> FacetKey:
+    """Aggregate key for a loaded repair."""
+    return facet_key(repair.category, repair.is_public, repair.is_successful, repair.object_name)
+
+
+def record_changes(db: Session, removed: Iterable[FacetKey] = (), added: Iterable[FacetKey] = ()) -> None:
+    """Apply aggregate deltas for repairs leaving and entering the table.
+
+    Callers pass the old key of an updated repair in `removed` and its new key
+    in `added`. Does not commit; the caller's transaction covers both the
+    repair write and the aggregate update.
+    """
+    count_deltas: Counter = Counter()
+    total_deltas: Counter = Counter()
+    public_deltas: Counter = Counter()
+
+    for sign, keys in ((-1, removed), (1, added)):
+        for category, is_public, outcome, object_name in keys:
+            count_deltas[(category, is_public, outcome)] += sign
+            total_deltas[(category, object_name)] += sign
+            if is_public:
+                public_deltas[(category, object_name)] += sign
+
+    insert = dialect_insert(db)
+
+    count_rows = [
+        {"category": category, "is_public": is_public, "outcome": outcome, "repair_count": delta}
+        for (category, is_public, outcome), delta in count_deltas.items()
+        if delta
+    ]
+    if count_rows:
+        table = RepairCountAggregate.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.category, table.c.is_public, table.c.outcome],
+            set_={"repair_count": table.c.repair_count + stmt.excluded.repair_count}
+        )
+        db.execute(stmt, count_rows)
+
+    object_rows = [
+        {
+            "category": category,
+            "object_name": object_name,
+            "total_count": total_deltas[(category, object_name)],
+            "public_count": public_deltas[(category, object_name)]
+        }
+        for category, object_name in total_deltas.keys() | public_deltas.keys()
+        if total_deltas[(category, object_name)] or public_deltas[(category, object_name)]
+    ]
+    if object_rows:
+        table = ObjectNameAggregate.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.category, table.c.object_name],
+            set_={
+                "total_count": table.c.total_count + stmt.excluded.total_count,
+                "public_count": table.c.public_count + stmt.excluded.public_count
+            }
+        )
+        db.execute(stmt, object_rows)
+
+    # Drop rows that reached zero so the aggregate tables stay small.
+    shrunk = {row["category"] for row in object_rows if row["total_count"] < 0}
+    if shrunk:
+        db.query(ObjectNameAggregate)\
+            .filter(ObjectNameAggregate.category.in_(shrunk))\
+            .filter(ObjectNameAggregate.total_count <= 0)\
+            .delete(synchronize_session=False)
+    if any(row["repair_count"] < 0 for row in count_rows):
+        db.query(RepairCountAggregate)\
+            .filter(RepairCountAggregate.repair_count <= 0)\
+            .delete(synchronize_session=False)
+
+
+def rebuild(db: Session) -> None:
+    """Recompute all aggregates from the `repairs` table and commit."""
+    db.query(RepairCountAggregate).delete(synchronize_session=False)
+    db.query(ObjectNameAggregate).delete(synchronize_session=False)
+
+    count_rows = db.query(
+        Repair.category, Repair.is_public, Repair.is_successful, func.count()
+    ).group_by(Repair.category, Repair.is_public, Repair.is_successful).all()
+
+    merged: Counter = Counter()
+    for category, is_public, is_successful, count in count_rows:
+        merged[(category, bool(is_public), _outcome(is_successful))] += count
+    db.add_all(
+        RepairCountAggregate(category=category, is_public=is_public, outcome=outcome, repair_count=count)
+        for (category, is_public, outcome), count in merged.items()
+    )
+
+    object_rows = db.query(
+        Repair.category,
+        Repair.object_name,
+        func.count(),
+        func.sum(case((Repair.is_public == True, 1), else_=0))
+    ).group_by(Repair.category, Repair.object_name).all()
+    db.add_all(
+        ObjectNameAggregate(category=category, object_name=object_name, total_count=total, public_count=public or 0)
+        for category, object_name, total, public in object_rows
+    )
+
+    db.commit()
+
+
+def ensure_backfilled(db: Session) -> None:
+    """Build aggregates once for databases created before they existed."""
+    has_aggregates = db.query(RepairCountAggregate.category).first() is not None
+    has_repairs = db.query(Repair.repair_id).first() is not None
+    if has_repairs and not has_aggregates:
+        rebuild(db)
+
+
+def get_facets(db: Session, public_only: bool = False, top: int = DEFAULT_TOP_OBJECTS) -> dict:
+    """Read category counts, success rates and top object names from the aggregates."""
+    query = db.query(RepairCountAggregate).filter(RepairCountAggregate.repair_count > 0)
+    if public_only:
+        query = query.filter(RepairCountAggregate.is_public == True)
+
+    by_category: dict[str, Counter] = {}
+    for row in query.all():
+        by_category.setdefault(row.category, Counter())[row.outcome] += row.repair_count
+
+    count_column = ObjectNameAggregate.public_count if public_only else ObjectNameAggregate.total_count
+
+    # Top objects for every category in one query: rank within each category,
+    # keep the first `top` ranks, then group in Python.
+    ranked = db.query(
+        ObjectNameAggregate.category.label("category"),
+        ObjectNameAggregate.object_name.label("object_name"),
+        count_column.label("count"),
+        func.row_number().over(
+            partition_by=ObjectNameAggregate.category,
+            order_by=(count_column.desc(), ObjectNameAggregate.object_name)
+        ).label("rank")
+    ).filter(ObjectNameAggregate.category.in_(by_category.keys()))\
+        .filter(count_column > 0)\
+        .subquery()
+
+    top_objects: dict[str, list[dict]] = {category: [] for category in by_category}
+    rows = db.query(ranked.c.category, ranked.c.object_name, ranked.c.count)\
+        .filter(ranked.c.rank <= top)\
+        .order_by(ranked.c.category, ranked.c.rank)
+    for category, name, count in rows:
+        top_objects[category].append({"objectName": name, "count": count})
+
+    categories = []
+    for category, outcomes in by_category.items():
+        successful = outcomes[OUTCOME_SUCCESSFUL]
+        failed = outcomes[OUTCOME_FAILED]
+        rated = successful + failed
+        categories.append({
+            "category": category,
+            "count": sum(outcomes.values()),
+            "successful": successful,
+            "failed": failed,
+            "successRate": successful / rated if rated else None,
+            "topObjects": top_objects[category]
+        })
+
+    categories.sort(key=lambda facet: (-facet["count"], facet["category"]))
+    return {
+        "total": sum(facet["count"] for facet in categories),
+        "categories": categories
+    }
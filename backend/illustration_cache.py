@@ -0,0 +1,139 @@
+"""Disk-backed cache for generated step illustrations.
+
+Entries are keyed by a hash of the model name, the full prompt and the
+reference image, and stored as raw image files. Total size is bounded by
+evicting the least recently used files; file mtimes record recency.
+
+The directory itself is the index: lookups stat the file for a key and every
+write rescans the directory before evicting, so several uvicorn workers
+sharing one directory stay within a single byte budget. A rescan costs one
+stat per cached file, which is negligible next to the billed generation
+that precedes every write. Hit and miss counters are per process.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+}
+_MIME_TYPES = {extension: mime for mime, extension in _EXTENSIONS.items()}
+
+
+def cache_key(model: str, prompt: str, reference_image: Optional[bytes]) -> str:
+    """Hash everything that determines the generated image."""
+    reference_hash = hashlib.sha256(reference_image).hexdigest() if reference_image else ""
+    digest = hashlib.sha256()
+    for part in (model, prompt, reference_hash):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IllustrationCache:
+    """LRU cache of image files on disk, bounded by total bytes."""
+
+    def __init__(self, directory: str, max_bytes: int, cost_per_image_usd: float):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.cost_per_image_usd = cost_per_image_usd
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        """(mtime, size, path) for every cached image, oldest first."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if Path(entry.name).suffix not in _MIME_TYPES:
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Evicted by another worker mid-scan.
+                    entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        except FileNotFoundError:
+            return []
+        return sorted(entries)
+
+    def _evict(self) -> None:
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+    def _find(self, key: str) -> Optional[Path]:
+        for extension in _MIME_TYPES:
+            path = self.directory / f"{key}{extension}"
+            if path.exists():
+                return path
+        return None
+
+    def get(self, key: str) -> Optional[tuple[str, bytes]]:
+        """Return (mime_type, image bytes) for a cached key and count the lookup."""
+        with self._lock:
+            path = self._find(key)
+            try:
+                if path is None:
+                    raise FileNotFoundError(key)
+                data = path.read_bytes()
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return _MIME_TYPES[path.suffix], data
+
+    def put(self, key: str, mime_type: str, data: bytes) -> None:
+        """Store an image, evicting least recently used files past the byte budget."""
+        extension = _EXTENSIONS.get(mime_type)
+        if extension is None or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{key}{extension}"
+            for other in _MIME_TYPES:
+                if other != extension:
+                    (self.directory / f"{key}{other}").unlink(missing_ok=True)
+            # Unique temp name so concurrent workers never share a partial file.
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        entries = self._scan()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else None,
+            "savedSpendUsd": round(self.hits * self.cost_per_image_usd, 4),
+            "entries": len(entries),
+            "totalBytes": sum(size for _, size, _ in entries),
+            "maxBytes": self.max_bytes,
+            "evictions": self.evictions
+        }
+
+
+cache = IllustrationCache(
+    settings.illustration_cache_dir,
+    settings.illustration_cache_max_bytes,
+    settings.illustration_cost_usd
+)
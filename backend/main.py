@@ -1,23 +1,42 @@
 """FastAPI application for FixIt repair backend."""
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
-from database import engine, Base
+from admission import AdmissionMiddleware
+from database import init_db
 from routers import repairs, gemini
 from config import get_settings
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+import gemini_service
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the schema on startup and warm the Gemini clients in the background."""
+    if settings.auto_create_schema:
+        await run_in_threadpool(init_db)
+    warm_up = asyncio.create_task(asyncio.to_thread(gemini_service.warm_up))
+    yield
+    warm_up.cancel()
+
+
 app = FastAPI(
     title="FixIt API",
     description="Backend API for the FixIt repair application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Shed excess /gemini requests before their bodies are read. Added before
+# CORS so that 503 responses still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS for frontend communication
 app.add_middleware(
     CORSMiddleware,
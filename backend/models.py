@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, Text, Float, JSON
+from sqlalchemy import Column, String, Integer, Boolean, Text, Float, JSON, Index
 from database import Base
 
 
@@ -28,3 +28,41 @@ class Repair(Base):
     
     # Steps stored as JSON array
     steps = Column(JSON, nullable=False, default=list)
+
+
+class ModerationRecord(Base):
+    """Persisted moderation verdict keyed by image content hash."""
+    
+    __tablename__ = "moderation_records"
+    
+    image_hash = Column(String, primary_key=True, index=True)
+    safe = Column(Boolean, nullable=False)
+    reason = Column(Text, nullable=True)
+    source = Column(String, nullable=False)  # "model" or "generated"
+    created_at = Column(Float, nullable=False)
+
+
+class RepairCountAggregate(Base):
+    """Repair counts per category, visibility and outcome, kept in sync on write."""
+    
+    __tablename__ = "repair_count_aggregates"
+    
+    category = Column(String, primary_key=True)
+    is_public = Column(Boolean, primary_key=True)
+    outcome = Column(String, primary_key=True)  # "successful", "failed" or "unknown"
+    repair_count = Column(Integer, nullable=False, default=0)
+
+
+class ObjectNameAggregate(Base):
+    """Repair counts per object name within a category, kept in sync on write."""
+    
+    __tablename__ = "object_name_aggregates"
+    __table_args__ = (
+        Index("ix_object_name_aggregates_total", "category", "total_count"),
+        Index("ix_object_name_aggregates_public", "category", "public_count"),
+    )
+    
+    category = Column(String, primary_key=True)
+    object_name = Column(String, primary_key=True)
+    total_count = Column(Integer, nullable=False, default=0)
+    public_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,194 @@
+"""Image moderation with a local hash prefilter and batched model calls.
+
+Every image is identified by the SHA-256 of its decoded bytes. A verdict is
+looked up in an in-memory cache, then in the `moderation_records` table, and
+only unseen images are queued for the model. Queued images are flushed to
+Gemini together, either when the batch is full or after a short wait.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import time
+from collections import OrderedDict
+
+import gemini_service
+from config import get_settings
+from database import SessionLocal
+from models import ModerationRecord
+from schemas import ModerationResponse
+
+settings = get_settings()
+
+UNAVAILABLE_REASON = "Moderation is temporarily unavailable. Please try again."
+INVALID_IMAGE_REASON = "The image could not be read."
+
+SOURCE_MODEL = "model"
+SOURCE_GENERATED = "generated"
+
+_verdict_cache: OrderedDict[str, ModerationResponse] = OrderedDict()
+
+
+def decode_image(photo_base64: str) -> bytes:
+    """Decode a raw base64 string or a base64 data URL into image bytes."""
+    if photo_base64.startswith("data:") and "," in photo_base64:
+        photo_base64 = photo_base64.split(",", 1)[1]
+    return base64.b64decode(photo_base64, validate=False)
+
+
+def image_hash(image_data: bytes) -> str:
+    """Content hash used as the moderation key."""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def _cache_get(key: str) -> ModerationResponse | None:
+    verdict = _verdict_cache.get(key)
+    if verdict is not None:
+        _verdict_cache.move_to_end(key)
+    return verdict
+
+
+def _cache_put(key: str, verdict: ModerationResponse) -> None:
+    _verdict_cache[key] = verdict
+    _verdict_cache.move_to_end(key)
+    while len(_verdict_cache) > settings.moderation_memory_cache_size:
+        _verdict_cache.popitem(last=False)
+
+
+def _load_verdict(key: str) -> ModerationResponse | None:
+    db = SessionLocal()
+    try:
+        record = db.query(ModerationRecord).filter(ModerationRecord.image_hash == key).first()
+        if record is None:
+            return None
+        return ModerationResponse(safe=record.safe, reason=record.reason)
+    finally:
+        db.close()
+
+
+def _store_verdicts(verdicts: dict[str, ModerationResponse], source: str) -> None:
+    db = SessionLocal()
+    try:
+        now = time.time()
+        for key, verdict in verdicts.items():
+            db.merge(ModerationRecord(
+                image_hash=key,
+                safe=verdict.safe,
+                reason=verdict.reason,
+                source=source,
+                created_at=now
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+class _ModerationBatcher:
+    """Collects pending images and moderates them in one model call per batch."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: dict[str, asyncio.Future] = {}
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._pending = {}
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, key: str, image_data: bytes) -> ModerationResponse:
+        """Queue an image and wait for its verdict. Identical images share one slot."""
+        self._ensure_worker()
+        future = self._pending.get(key)
+        if future is None:
+            future = self._loop.create_future()
+            self._pending[key] = future
+            self._queue.put_nowait((key, image_data))
+        return await asyncio.shield(future)
+
+    async def _run(self) -> None:
+        max_wait = settings.moderation_batch_wait_ms / 1000
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + max_wait
+            while len(batch) < settings.moderation_batch_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[str, bytes]]) -> None:
+        try:
+            verdicts = await asyncio.wait_for(
+                asyncio.to_thread(gemini_service.moderate_images, [data for _, data in batch]),
+                timeout=settings.moderation_timeout_seconds
+            )
+        except Exception as e:
+            print(f"Moderation batch of {len(batch)} failed: {e}")
+            verdicts = [None] * len(batch)
+
+        decided: dict[str, ModerationResponse] = {}
+        for (key, _), verdict in zip(batch, verdicts):
+            if verdict is not None:
+                decided[key] = verdict
+                _cache_put(key, verdict)
+
+        if decided:
+            try:
+                await asyncio.to_thread(_store_verdicts, decided, SOURCE_MODEL)
+            except Exception as e:
+                print(f"Storing moderation verdicts failed: {e}")
+
+        for key, _ in batch:
+            future = self._pending.pop(key, None)
+            if future is not None and not future.done():
+                # Fail closed: an image we could not check is never published.
+                future.set_result(decided.get(key) or ModerationResponse(safe=False, reason=UNAVAILABLE_REASON))
+
+
+_batcher = _ModerationBatcher()
+
+
+async def moderate(photo_base64: str) -> ModerationResponse:
+    """Moderate an image, reusing any stored verdict for identical content."""
+    try:
+        image_data = decode_image(photo_base64)
+    except (binascii.Error, ValueError):
+        return ModerationResponse(safe=False, reason=INVALID_IMAGE_REASON)
+    if not image_data:
+        return ModerationResponse(safe=False, reason=INVALID_IMAGE_REASON)
+
+    key = image_hash(image_data)
+
+    verdict = _cache_get(key)
+    if verdict is not None:
+        return verdict
+
+    verdict = await asyncio.to_thread(_load_verdict, key)
+    if verdict is not None:
+        _cache_put(key, verdict)
+        return verdict
+
+    return await _batcher.submit(key, image_data)
+
+
+async def approve_generated(image_url: str | None) -> None:
+    """Allowlist an image produced by our own generation pipeline."""
+    if not image_url:
+        return
+    try:
+        key = image_hash(decode_image(image_url))
+        verdict = ModerationResponse(safe=True, reason=None)
+        _cache_put(key, verdict)
+        await asyncio.to_thread(_store_verdicts, {key: verdict}, SOURCE_GENERATED)
+    except Exception as e:
+        print(f"Allowlisting generated image failed: {e}")
@@ -0,0 +1,191 @@
+"""Streaming NDJSON export and batched import of repairs.
+
+Export walks the `repairs` table with a server-side cursor and yields one JSON
+document per line, so memory stays flat regardless of table size. Import reads
+lines incrementally and upserts them in fixed-size batches with a single
+executemany-style statement per batch.
+"""
+
+import json
+from typing import Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
+
+from database import dialect_insert
+from models import Repair
+import facets
+from schemas import RepairExportRecord
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 10000
+
+# Columns holding base64 image data; skipped unless images are requested.
+IMAGE_COLUMNS = ("user_photo_url", "ideal_view_image_url")
+
+# Columns an image-less record must not overwrite on an existing repair.
+# `steps` carries each step's generatedImageUrl, which image-less exports strip.
+IMAGE_BEARING_COLUMNS = IMAGE_COLUMNS + ("steps",)
+
+ProgressCallback = Optional[Callable[[int], None]]
+
+
+def _repair_to_record(repair: Repair, include_images: bool) -> dict:
+    """Serialize a repair to the camelCase export format."""
+    steps = repair.steps or []
+    if not include_images:
+        steps = [{k: v for k, v in step.items() if k != "generatedImageUrl"} for step in steps]
+
+    record = {
+        "repairId": repair.repair_id,
+        "timestamp": repair.timestamp,
+        "isPublic": repair.is_public,
+        "isSuccessful": repair.is_successful,
+        "status": repair.status,
+        "objectName": repair.object_name,
+        "category": repair.category,
+        "issueType": repair.issue_type,
+        "safetyWarning": repair.safety_warning,
+        "toolsNeeded": repair.tools_needed,
+        "idealViewInstruction": repair.ideal_view_instruction,
+        "manualUrl": repair.manual_url,
+        "steps": steps
+    }
+    if include_images:
+        record["userPhotoUrl"] = repair.user_photo_url
+        record["idealViewImageUrl"] = repair.ideal_view_image_url
+    return record
+
+
+def iter_export_lines(
+    db: Session,
+    include_images: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: ProgressCallback = None
+) -> Iterator[str]:
+    """Yield every repair as an NDJSON line, oldest first."""
+    query = select(Repair).order_by(Repair.timestamp, Repair.repair_id)
+    if not include_images:
+        query = query.options(*(defer(getattr(Repair, column)) for column in IMAGE_COLUMNS))
+    query = query.execution_options(stream_results=True, yield_per=batch_size)
+
+    count = 0
+    for repair in db.scalars(query):
+        yield json.dumps(_repair_to_record(repair, include_images)) + "\n"
+        count += 1
+        if on_progress and count % batch_size == 0:
+            on_progress(count)
+        # Rows are not needed after serialization; keep the identity map small.
+        db.expunge(repair)
+
+    if on_progress and (count == 0 or count % batch_size):
+        on_progress(count)
+
+
+def _record_to_row(record: RepairExportRecord) -> dict:
+    """Map a validated export record to `repairs` column values."""
+    row = {
+        "repair_id": record.repairId,
+        "timestamp": record.timestamp,
+        "is_public": record.isPublic,
+        "is_successful": record.isSuccessful,
+        "status": record.status,
+        "object_name": record.objectName,
+        "category": record.category,
+        "issue_type": record.issueType,
+        "safety_warning": record.safetyWarning,
+        "tools_needed": record.toolsNeeded,
+        "ideal_view_instruction": record.idealViewInstruction,
+        "manual_url": record.manualUrl,
+        "steps": [step.model_dump() for step in record.steps]
+    }
+    if record.userPhotoUrl is not None:
+        row["user_photo_url"] = record.userPhotoUrl
+        row["ideal_view_image_url"] = record.idealViewImageUrl
+    return row
+
+
+def _upsert_rows(db: Session, rows: list[dict]) -> None:
+    """Insert or update a batch of rows with one statement per column set."""
+    insert = dialect_insert(db)
+
+    # Later lines win when a file repeats a repair ID.
+    rows = list({row["repair_id"]: row for row in rows}.values())
+
+    existing = db.execute(
+        select(Repair.category, Repair.is_public, Repair.is_successful, Repair.object_name)
+        .where(Repair.repair_id.in_([row["repair_id"] for row in rows]))
+    ).all()
+    facets.record_changes(
+        db,
+        removed=[facets.facet_key(*values) for values in existing],
+        added=[
+            facets.facet_key(row["category"], row["is_public"], row["is_successful"], row["object_name"])
+            for row in rows
+        ]
+    )
+
+    # Rows exported without images keep whatever images and steps the target
+    # already has; new repairs are inserted with the stripped steps.
+    groups: dict[tuple, list[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    for columns, group in groups.items():
+        has_images = "user_photo_url" in columns
+        if not has_images:
+            group = [{**row, "user_photo_url": ""} for row in group]
+        stmt = insert(Repair.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Repair.repair_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in columns
+                if column != "repair_id" and (has_images or column not in IMAGE_BEARING_COLUMNS)
+            }
+        )
+        db.execute(stmt, group)
+
+
+def import_lines(
+    db: Session,
+    lines: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: ProgressCallback = None,
+    line_offset: int = 0
+) -> int:
+    """Upsert repairs from NDJSON lines, committing once per batch.
+
+    Raises ValueError naming the offending line if a record is invalid;
+    batches before it stay committed. `line_offset` is added to reported
+    line numbers when the input arrives in chunks.
+    """
+    batch: list[dict] = []
+    count = 0
+
+    for line_number, line in enumerate(lines, start=line_offset + 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = RepairExportRecord.model_validate_json(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid repair on line {line_number}: {e}") from e
+
+        batch.append(_record_to_row(record))
+        if len(batch) >= batch_size:
+            _upsert_rows(db, batch)
+            db.commit()
+            count += len(batch)
+            batch = []
+            if on_progress:
+                on_progress(count)
+
+    if batch:
+        _upsert_rows(db, batch)
+        db.commit()
+        count += len(batch)
+        if on_progress:
+            on_progress(count)
+
+    return count
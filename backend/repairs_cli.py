@@ -0,0 +1,111 @@
+"""Command-line export and import of repairs as NDJSON.
+
+Usage:
+    python repairs_cli.py export [--include-images] [-o repairs.ndjson]
+    python repairs_cli.py import repairs.ndjson
+    python repairs_cli.py rebuild-facets
+    python repairs_cli.py init-db
+
+Runs directly against DATABASE_URL, so it can move data between environments
+without going through the API.
+"""
+
+import argparse
+import sys
+
+from database import SessionLocal, engine, Base, init_db
+import facets
+import repair_transfer
+
+
+def _progress(verb: str):
+    def report(count: int) -> None:
+        print(f"{verb} {count} repairs", file=sys.stderr)
+    return report
+
+
+def _batch_size(value: str) -> int:
+    size = int(value)
+    if not 1 <= size <= repair_transfer.MAX_BATCH_SIZE:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {repair_transfer.MAX_BATCH_SIZE}")
+    return size
+
+
+def export_command(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    out = open(args.output, "w", encoding="utf-8") if args.output != "-" else sys.stdout
+    try:
+        for line in repair_transfer.iter_export_lines(
+            db,
+            include_images=args.include_images,
+            batch_size=args.batch_size,
+            on_progress=_progress("Exported")
+        ):
+            out.write(line)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        db.close()
+
+
+def import_command(args: argparse.Namespace) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    source = open(args.input, "r", encoding="utf-8") if args.input != "-" else sys.stdin
+    try:
+        repair_transfer.import_lines(
+            db,
+            source,
+            batch_size=args.batch_size,
+            on_progress=_progress("Imported")
+        )
+    except ValueError as e:
+        sys.exit(f"Import stopped: {e}")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        db.close()
+
+
+def rebuild_facets_command(args: argparse.Namespace) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        facets.rebuild(db)
+        print("Rebuilt feed aggregates", file=sys.stderr)
+    finally:
+        db.close()
+
+
+def init_db_command(args: argparse.Namespace) -> None:
+    init_db()
+    print("Database schema is up to date", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import FixIt repairs as NDJSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write all repairs as NDJSON")
+    export_parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    export_parser.add_argument("--include-images", action="store_true", help="Include base64 image fields")
+    export_parser.add_argument("--batch-size", type=_batch_size, default=repair_transfer.DEFAULT_BATCH_SIZE)
+    export_parser.set_defaults(func=export_command)
+
+    import_parser = subparsers.add_parser("import", help="Upsert repairs from NDJSON")
+    import_parser.add_argument("input", help="Input file, or - for stdin")
+    import_parser.add_argument("--batch-size", type=_batch_size, default=repair_transfer.DEFAULT_BATCH_SIZE)
+    import_parser.set_defaults(func=import_command)
+
+    rebuild_parser = subparsers.add_parser("rebuild-facets", help="Recompute feed aggregates from repairs")
+    rebuild_parser.set_defaults(func=rebuild_facets_command)
+
+    init_parser = subparsers.add_parser("init-db", help="Create missing tables and backfill aggregates")
+    init_parser.set_defaults(func=init_db_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
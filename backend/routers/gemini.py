@@ -5,11 +5,15 @@ from schemas import (
     AnalyzeImageRequest,
     FindManualRequest,
     GenerateStepImageRequest,
+    StepImageResponse,
     TroubleshootRequest,
     ModerateImageRequest,
     ModerationResponse
 )
+from admission import admission_stats
 import gemini_service
+import illustration_cache
+import moderation
 
 router = APIRouter(prefix="/gemini", tags=["gemini"])
 
@@ -31,17 +35,28 @@ async def find_manual(request: FindManualRequest):
     return {"url": url}
 
 
-@router.post("/generate-step-image")
+@router.post("/generate-step-image", response_model=StepImageResponse)
 async def generate_step_image(request: GenerateStepImageRequest):
     """Generate a technical illustration for a repair step."""
-    image_url = await gemini_service.generate_step_image(
+    result = await gemini_service.generate_step_image(
         request.objectName,
         request.stepDescription,
         request.idealView,
         request.referenceImageBase64,
         request.shouldHighlight
     )
-    return {"imageUrl": image_url}
+    # Only text-only illustrations are ours end to end. Highlights and
+    # reference edits are derived from the caller's photo and stay moderated.
+    # Cache hits were allowlisted when first generated.
+    if not request.referenceImageBase64 and not result.cached:
+        await moderation.approve_generated(result.imageUrl)
+    return result
+
+
+@router.get("/illustrations/stats")
+def get_illustration_cache_stats():
+    """Hit rate and saved spend for the step illustration cache."""
+    return illustration_cache.cache.stats()
 
 
 @router.post("/troubleshoot")
@@ -59,5 +74,10 @@ async def troubleshoot(request: TroubleshootRequest):
 @router.post("/moderate", response_model=ModerationResponse)
 async def moderate_image(request: ModerateImageRequest):
     """Moderate an image for safety before public posting."""
-    result = await gemini_service.moderate_image(request.photoBase64)
-    return result
+    return await moderation.moderate(request.photoBase64)
+
+
+@router.get("/admission")
+def get_admission_stats():
+    """Current load and rejection counts per AI endpoint."""
+    return admission_stats()
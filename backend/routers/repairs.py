@@ -1,12 +1,16 @@
 """API routes for repair CRUD operations."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from database import get_db
+from database import get_db, SessionLocal
 from models import Repair
-from schemas import RepairCreate, RepairResponse
+from schemas import RepairCreate, RepairResponse, ImportResult, FacetsResponse
+import facets
+import repair_transfer
 
 router = APIRouter(prefix="/repairs", tags=["repairs"])
 
@@ -39,6 +43,7 @@ def save_repair(repair: RepairCreate, db: Session = Depends(get_db)):
     
     if db_repair:
         # Update existing
+        old_facet_key = facets.repair_facet_key(db_repair)
         db_repair.timestamp = repair.timestamp
         db_repair.is_public = repair.isPublic
         db_repair.is_successful = repair.isSuccessful
@@ -53,6 +58,7 @@ def save_repair(repair: RepairCreate, db: Session = Depends(get_db)):
         db_repair.ideal_view_image_url = repair.idealViewImageUrl
         db_repair.manual_url = repair.manualUrl
         db_repair.steps = [step.model_dump() for step in repair.steps]
+        facets.record_changes(db, removed=[old_facet_key], added=[facets.repair_facet_key(db_repair)])
     else:
         # Create new
         db_repair = Repair(
@@ -73,6 +79,7 @@ def save_repair(repair: RepairCreate, db: Session = Depends(get_db)):
             steps=[step.model_dump() for step in repair.steps]
         )
         db.add(db_repair)
+        facets.record_changes(db, added=[facets.repair_facet_key(db_repair)])
     
     db.commit()
     db.refresh(db_repair)
@@ -117,6 +124,98 @@ def get_public_repairs(db: Session = Depends(get_db)):
     return [repair_to_response(r) for r in repairs]
 
 
+@router.get("/facets", response_model=FacetsResponse)
+def get_facets(
+    public_only: bool = False,
+    top: int = Query(facets.DEFAULT_TOP_OBJECTS, ge=1, le=facets.MAX_TOP_OBJECTS),
+    db: Session = Depends(get_db)
+):
+    """Get repair counts, success rates and top objects per category."""
+    return facets.get_facets(db, public_only=public_only, top=top)
+
+
+@router.get("/export")
+def export_repairs(
+    include_images: bool = False,
+    batch_size: int = Query(repair_transfer.DEFAULT_BATCH_SIZE, ge=1, le=repair_transfer.MAX_BATCH_SIZE)
+):
+    """Stream every repair as NDJSON, one document per line."""
+    def generate():
+        # The request-scoped session is closed before the body streams, so
+        # the export owns its own session for the lifetime of the cursor.
+        db = SessionLocal()
+        try:
+            yield from repair_transfer.iter_export_lines(
+                db,
+                include_images=include_images,
+                batch_size=batch_size,
+                on_progress=lambda count: print(f"Exported {count} repairs")
+            )
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="repairs.ndjson"'}
+    )
+
+
+async def _iter_request_lines(request: Request) -> AsyncIterator[str]:
+    """Split a streamed request body into lines without buffering it whole."""
+    # Pieces of the current partial line; joined once when its newline arrives
+    # so a long line split over many chunks is not re-copied per chunk.
+    pending: list[bytes] = []
+    async for chunk in request.stream():
+        *lines, rest = chunk.split(b"\n")
+        for line in lines:
+            pending.append(line)
+            yield b"".join(pending).decode("utf-8")
+            pending = []
+        if rest:
+            pending.append(rest)
+    if pending:
+        yield b"".join(pending).decode("utf-8")
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_repairs(
+    request: Request,
+    batch_size: int = Query(repair_transfer.DEFAULT_BATCH_SIZE, ge=1, le=repair_transfer.MAX_BATCH_SIZE)
+):
+    """Upsert repairs from an NDJSON request body in batches."""
+    db = SessionLocal()
+    imported = 0
+    lines_read = 0
+    chunk: list[str] = []
+
+    async def flush():
+        nonlocal imported, lines_read, chunk
+        imported += await run_in_threadpool(
+            repair_transfer.import_lines, db, chunk, batch_size, None, lines_read
+        )
+        lines_read += len(chunk)
+        chunk = []
+        print(f"Imported {imported} repairs")
+
+    try:
+        async for line in _iter_request_lines(request):
+            chunk.append(line)
+            if len(chunk) >= batch_size:
+                await flush()
+        if chunk:
+            await flush()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{e}. {imported} repairs were imported before the error."
+        )
+    finally:
+        db.close()
+
+    return {"imported": imported}
+
+
 @router.get("/{repair_id}")
 def get_repair(repair_id: str, db: Session = Depends(get_db)):
     """Get a specific repair by ID."""
@@ -134,5 +233,6 @@ def delete_repair(repair_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Repair not found")
     
     db.delete(repair)
+    facets.record_changes(db, removed=[facets.repair_facet_key(repair)])
     db.commit()
     return {"message": "Repair deleted"}
@@ -62,6 +62,41 @@ class RepairResponse(RepairCreate):
     pass
 
 
+class RepairExportRecord(RepairCreate):
+    """One line of an NDJSON repair export. Images are optional, and fields
+    whose columns allow NULL accept null so every export imports back."""
+    userPhotoUrl: Optional[str] = None
+    toolsNeeded: Optional[bool] = None
+    idealViewInstruction: Optional[str] = None
+
+
+class ImportResult(BaseModel):
+    """Summary of a bulk repair import."""
+    imported: int
+
+
+class ObjectFacet(BaseModel):
+    """Repair count for one object name."""
+    objectName: str
+    count: int
+
+
+class CategoryFacet(BaseModel):
+    """Aggregated repair counts for one category."""
+    category: str
+    count: int
+    successful: int
+    failed: int
+    successRate: Optional[float] = None
+    topObjects: list[ObjectFacet]
+
+
+class FacetsResponse(BaseModel):
+    """Category facets for the feed."""
+    total: int
+    categories: list[CategoryFacet]
+
+
 class AnalyzeImageRequest(BaseModel):
     """Request for image analysis."""
     photoBase64: str
@@ -82,6 +117,12 @@ class GenerateStepImageRequest(BaseModel):
     shouldHighlight: Optional[bool] = False
 
 
+class StepImageResponse(BaseModel):
+    """Generated step illustration as a data URL."""
+    imageUrl: Optional[str] = None
+    cached: bool = False
+
+
 class TroubleshootRequest(BaseModel):
     """Request for troubleshooting."""
     photoBase64: str
@@ -0,0 +1,77 @@
+"""Shared fixtures. Settings are read from the environment at import time,
+so the throwaway database and cache directory are configured before any
+backend module is imported."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_TMP_DIR = tempfile.mkdtemp(prefix="fixit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["ILLUSTRATION_CACHE_DIR"] = f"{_TMP_DIR}/illustration_cache"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import pytest
+
+from database import Base, SessionLocal, engine, init_db
+import moderation
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def fresh_db():
+    """Give every test empty tables and an empty moderation cache."""
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    moderation._verdict_cache.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+async def client():
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+
+
+def make_repair(repair_id: str, **overrides) -> dict:
+    """A valid repair payload for POST /repairs/."""
+    repair = {
+        "repairId": repair_id,
+        "timestamp": 1.0,
+        "isPublic": False,
+        "isSuccessful": None,
+        "userPhotoUrl": "data:image/jpeg;base64,cGhvdG8=",
+        "idealViewImageUrl": None,
+        "manualUrl": None,
+        "status": "ok",
+        "objectName": "Kitchen Faucet",
+        "category": "plumbing",
+        "issueType": "Dripping",
+        "safetyWarning": None,
+        "toolsNeeded": True,
+        "idealViewInstruction": "Look under the sink",
+        "steps": [
+            {"stepNumber": 1, "instruction": "Gather tools", "visualDescription": "Tools on a table"}
+        ]
+    }
+    repair.update(overrides)
+    return repair
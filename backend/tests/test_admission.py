@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+import admission
+import gemini_service
+from config import DEFAULT_ADMISSION_LIMITS, REPAIR_STEP_IMAGE_BURST, Settings
+from schemas import StepImageResponse
+
+pytestmark = pytest.mark.anyio
+
+
+def test_partial_limit_override_keeps_defaults():
+    settings = Settings(admission_limits={"generate-step-image": (1, 2)})
+
+    assert settings.admission_limits == {**DEFAULT_ADMISSION_LIMITS, "generate-step-image": (1, 2)}
+
+
+@pytest.mark.parametrize("limits", [(0, 2), (1, -1)])
+def test_invalid_limits_are_rejected(limits):
+    with pytest.raises(ValidationError):
+        Settings(admission_limits={"analyze": limits})
+
+
+async def test_burst_is_bounded_and_excess_gets_retry_after():
+    limiter = admission.EndpointLimiter("test", max_concurrent=2, max_queued=1, max_wait_seconds=5)
+    release = asyncio.Event()
+
+    async def request():
+        async with limiter.admit():
+            await release.wait()
+
+    tasks = [asyncio.create_task(request()) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    assert limiter.active == 2
+    assert limiter.queued == 1
+
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    rejected = [result for result in results if isinstance(result, admission.AdmissionRejected)]
+    assert len(rejected) == 2
+    assert all(result.retry_after >= 1 for result in rejected)
+    assert limiter.stats()["rejected"] == 2
+    assert limiter.active == 0 and limiter.queued == 0
+
+
+async def test_queued_request_times_out():
+    limiter = admission.EndpointLimiter("test", max_concurrent=1, max_queued=1, max_wait_seconds=0.01)
+
+    async with limiter.admit():
+        with pytest.raises(admission.AdmissionRejected):
+            async with limiter.admit():
+                pass
+
+    assert limiter.queued == 0
+
+
+async def test_rejected_request_body_is_never_read(monkeypatch):
+    limiter = admission.EndpointLimiter("analyze", max_concurrent=1, max_queued=0, max_wait_seconds=1)
+    monkeypatch.setitem(admission._limiters, "analyze", limiter)
+    inner_called = False
+
+    async def inner_app(scope, receive, send):
+        nonlocal inner_called
+        inner_called = True
+
+    async def receive():
+        raise AssertionError("body was read for a shed request")
+
+    sent: list[dict] = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = admission.AdmissionMiddleware(inner_app)
+    scope = {"type": "http", "method": "POST", "path": "/gemini/analyze", "headers": []}
+
+    async with limiter.admit():
+        await middleware(scope, receive, send)
+
+    assert not inner_called
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", str(limiter.retry_after()).encode()) in sent[0]["headers"]
+
+
+async def test_cheap_endpoints_bypass_saturated_limits(client, monkeypatch):
+    limiter = admission.EndpointLimiter("generate-step-image", max_concurrent=1, max_queued=0, max_wait_seconds=1)
+    monkeypatch.setitem(admission._limiters, "generate-step-image", limiter)
+    release = asyncio.Event()
+
+    async def slow_generate(*args, **kwargs):
+        await release.wait()
+        return StepImageResponse()
+
+    monkeypatch.setattr(gemini_service, "generate_step_image", slow_generate)
+    body = {"objectName": "Lamp", "stepDescription": "Unscrew", "idealView": "Front"}
+
+    first = asyncio.create_task(client.post("/gemini/generate-step-image", json=body))
+    await asyncio.sleep(0.05)
+    shed = await client.post("/gemini/generate-step-image", json=body)
+    health = await client.get("/health")
+    release.set()
+
+    assert shed.status_code == 503
+    assert "retry-after" in shed.headers
+    assert health.status_code == 200
+    assert (await first).status_code == 200
+
+
+async def test_default_limits_admit_one_repairs_step_images(client, monkeypatch):
+    max_concurrent, max_queued = DEFAULT_ADMISSION_LIMITS["generate-step-image"]
+    limiter = admission.EndpointLimiter(
+        "generate-step-image", max_concurrent, max_queued, Settings().admission_max_wait_seconds
+    )
+    monkeypatch.setitem(admission._limiters, "generate-step-image", limiter)
+
+    async def generate(*args, **kwargs):
+        await asyncio.sleep(0.02)
+        return StepImageResponse()
+
+    monkeypatch.setattr(gemini_service, "generate_step_image", generate)
+    body = {"objectName": "Lamp", "stepDescription": "Unscrew", "idealView": "Front"}
+
+    responses = await asyncio.gather(*(
+        client.post("/gemini/generate-step-image", json=body) for _ in range(REPAIR_STEP_IMAGE_BURST)
+    ))
+
+    assert [response.status_code for response in responses] == [200] * REPAIR_STEP_IMAGE_BURST
+    assert limiter.rejected == 0
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+import facets
+from conftest import make_repair
+from models import ObjectNameAggregate, RepairCountAggregate
+
+pytestmark = pytest.mark.anyio
+
+
+def _aggregate_rows(db) -> tuple[set, set]:
+    counts = {
+        (row.category, row.is_public, row.outcome, row.repair_count)
+        for row in db.query(RepairCountAggregate).filter(RepairCountAggregate.repair_count != 0)
+    }
+    objects = {
+        (row.category, row.object_name, row.total_count, row.public_count)
+        for row in db.query(ObjectNameAggregate).filter(ObjectNameAggregate.total_count != 0)
+    }
+    return counts, objects
+
+
+async def test_incremental_aggregates_match_rebuild(client, db):
+    categories = ["plumbing", "electronics", "furniture"]
+    outcomes = [True, False, None]
+    for i in range(12):
+        await client.post("/repairs/", json=make_repair(
+            f"r{i}",
+            category=categories[i % 3],
+            isPublic=i % 2 == 0,
+            isSuccessful=outcomes[i % 3],
+            objectName=f"Object {i % 4}"
+        ))
+
+    # Updates that move a repair between category, visibility and outcome.
+    await client.post("/repairs/", json=make_repair("r1", category="appliance", isPublic=False, isSuccessful=None, objectName="Object 1"))
+    await client.post("/repairs/", json=make_repair("r2", category="furniture", isPublic=True, isSuccessful=True, objectName="Object 2"))
+    await client.post("/repairs/", json=make_repair("r3", category="plumbing", isPublic=True, isSuccessful=False, objectName="Renamed"))
+    await client.delete("/repairs/r4")
+    await client.delete("/repairs/r5")
+
+    # Import that updates existing repairs, adds a new one and repeats an ID.
+    lines = [
+        json.dumps(make_repair("r6", category="other", isPublic=True, isSuccessful=True, objectName="Object 2")),
+        json.dumps(make_repair("r7", isPublic=True)),
+        json.dumps(make_repair("new", category="electronics", isSuccessful=False)),
+        json.dumps(make_repair("r7", category="other", isPublic=False, isSuccessful=True)),
+    ]
+    await client.post("/repairs/import?batch_size=3", content="\n".join(lines))
+
+    incremental = _aggregate_rows(db)
+    all_facets = (await client.get("/repairs/facets")).json()
+    public_facets = (await client.get("/repairs/facets?public_only=true&top=2")).json()
+
+    facets.rebuild(db)
+
+    assert _aggregate_rows(db) == incremental
+    assert (await client.get("/repairs/facets")).json() == all_facets
+    assert (await client.get("/repairs/facets?public_only=true&top=2")).json() == public_facets
+    assert all_facets["total"] == 11
+
+
+async def test_facets_report_counts_and_success_rate(client):
+    await client.post("/repairs/", json=make_repair("a", isPublic=True, isSuccessful=True))
+    await client.post("/repairs/", json=make_repair("b", isPublic=True, isSuccessful=False))
+    await client.post("/repairs/", json=make_repair("c", isSuccessful=None, objectName="Toilet"))
+
+    body = (await client.get("/repairs/facets")).json()
+    public = (await client.get("/repairs/facets?public_only=true")).json()
+
+    plumbing = body["categories"][0]
+    assert plumbing["count"] == 3
+    assert plumbing["successRate"] == 0.5
+    assert plumbing["topObjects"] == [
+        {"objectName": "Kitchen Faucet", "count": 2},
+        {"objectName": "Toilet", "count": 1},
+    ]
+    assert public["total"] == 2
+
+
+async def test_deleting_last_repair_clears_aggregate_rows(client, db):
+    await client.post("/repairs/", json=make_repair("a"))
+    await client.delete("/repairs/a")
+
+    assert db.query(RepairCountAggregate).count() == 0
+    assert db.query(ObjectNameAggregate).count() == 0
+    assert (await client.get("/repairs/facets")).json() == {"total": 0, "categories": []}
+
+
+async def test_top_objects_for_all_categories_in_one_query(client, db):
+    for i in range(12):
+        await client.post("/repairs/", json=make_repair(
+            f"r{i}", category=f"category {i % 4}", objectName=f"Object {i % 3}"
+        ))
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        body = facets.get_facets(db, top=2)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    # One query for the category counts, one for every category's top objects.
+    assert len(statements) == 2
+    assert len(body["categories"]) == 4
+    assert all(len(facet["topObjects"]) == 2 for facet in body["categories"])
+    assert body["categories"][0]["topObjects"] == [
+        {"objectName": "Object 0", "count": 1},
+        {"objectName": "Object 1", "count": 1},
+    ]
+
+
+@pytest.mark.parametrize("top", [0, -1, 51])
+async def test_top_is_validated(client, top):
+    response = await client.get(f"/repairs/facets?top={top}")
+
+    assert response.status_code == 422
@@ -0,0 +1,138 @@
+import os
+import types
+
+import pytest
+
+import gemini_service
+import illustration_cache
+import moderation
+from illustration_cache import IllustrationCache, cache_key
+
+pytestmark = pytest.mark.anyio
+
+
+def _age(cache: IllustrationCache, key: str, seconds_ago: int) -> None:
+    path = cache.directory / f"{key}.png"
+    mtime = path.stat().st_mtime - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def test_cache_key_covers_model_prompt_and_reference():
+    base = cache_key("model", "prompt", None)
+
+    assert cache_key("model", "prompt", None) == base
+    assert cache_key("other", "prompt", None) != base
+    assert cache_key("model", "prompt 2", None) != base
+    assert cache_key("model", "prompt", b"photo") != base
+
+
+def test_least_recently_used_is_evicted_by_bytes(tmp_path):
+    cache = IllustrationCache(str(tmp_path), max_bytes=250, cost_per_image_usd=0.04)
+    cache.put("a", "image/png", b"a" * 100)
+    cache.put("b", "image/png", b"b" * 100)
+    _age(cache, "a", 20)
+    _age(cache, "b", 10)
+
+    assert cache.get("a") == ("image/png", b"a" * 100)  # refreshes "a"
+    cache.put("c", "image/png", b"c" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["totalBytes"] == 200
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["savedSpendUsd"] == 0.08
+
+
+def test_workers_sharing_a_directory_share_the_budget(tmp_path):
+    worker_a = IllustrationCache(str(tmp_path), max_bytes=250, cost_per_image_usd=0)
+    worker_b = IllustrationCache(str(tmp_path), max_bytes=250, cost_per_image_usd=0)
+
+    for i in range(4):
+        worker = worker_a if i % 2 == 0 else worker_b
+        worker.put(f"k{i}", "image/png", bytes(100))
+        _age(worker, f"k{i}", 10 - i)
+
+    assert worker_a.stats()["totalBytes"] <= 250
+    # Entries written by one worker are visible to the other.
+    assert worker_a.get("k3") is not None
+
+
+def test_unsupported_or_oversized_images_are_not_stored(tmp_path):
+    cache = IllustrationCache(str(tmp_path), max_bytes=10, cost_per_image_usd=0)
+    cache.put("gif", "image/gif", b"x")
+    cache.put("big", "image/png", bytes(11))
+
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def image_model(monkeypatch, tmp_path):
+    """Fake image client that counts generations; fresh cache per test."""
+    calls = []
+
+    async def generate_content(**kwargs):
+        calls.append(kwargs)
+        inline = types.SimpleNamespace(mime_type="image/png", data=b"\x89PNG" + bytes([len(calls)]) * 16)
+        part = types.SimpleNamespace(inline_data=inline)
+        return types.SimpleNamespace(candidates=[types.SimpleNamespace(content=types.SimpleNamespace(parts=[part]))])
+
+    client = types.SimpleNamespace(aio=types.SimpleNamespace(models=types.SimpleNamespace(generate_content=generate_content)))
+    monkeypatch.setattr(gemini_service, "get_image_client", lambda: client)
+    monkeypatch.setattr(illustration_cache, "cache", IllustrationCache(str(tmp_path), 10_000, 0.039))
+    return calls
+
+
+async def test_repeated_prompt_is_served_from_cache(client, image_model, monkeypatch):
+    approved = []
+
+    async def record_approval(image_url):
+        approved.append(image_url)
+
+    monkeypatch.setattr(moderation, "approve_generated", record_approval)
+    body = {"objectName": "Lamp", "stepDescription": "Unscrew", "idealView": "Front"}
+
+    first = (await client.post("/gemini/generate-step-image", json=body)).json()
+    second = (await client.post("/gemini/generate-step-image", json=body)).json()
+
+    assert len(image_model) == 1
+    assert first["imageUrl"] == second["imageUrl"]
+    assert first["imageUrl"].startswith("data:image/png;base64,")
+    assert (first["cached"], second["cached"]) == (False, True)
+    # Only the fresh generation is allowlisted.
+    assert approved == [first["imageUrl"]]
+
+    stats = (await client.get("/gemini/illustrations/stats")).json()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+async def test_unwritable_cache_still_returns_generated_image(client, image_model, monkeypatch, tmp_path):
+    # A regular file where the cache directory should be: every read and
+    # write under it fails with an OSError.
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_bytes(b"")
+    monkeypatch.setattr(illustration_cache, "cache", IllustrationCache(str(blocker / "cache"), 10_000, 0))
+    body = {"objectName": "Lamp", "stepDescription": "Unscrew", "idealView": "Front"}
+
+    first = (await client.post("/gemini/generate-step-image", json=body)).json()
+    second = (await client.post("/gemini/generate-step-image", json=body)).json()
+
+    assert first["imageUrl"].startswith("data:image/png;base64,")
+    assert second["imageUrl"].startswith("data:image/png;base64,")
+    assert (first["cached"], second["cached"]) == (False, False)
+    assert len(image_model) == 2
+
+
+async def test_cache_read_error_counts_as_miss(client, image_model, monkeypatch):
+    def failing_get(key):
+        raise PermissionError(key)
+
+    monkeypatch.setattr(illustration_cache.cache, "get", failing_get)
+    body = {"objectName": "Lamp", "stepDescription": "Unscrew", "idealView": "Front"}
+
+    response = (await client.post("/gemini/generate-step-image", json=body)).json()
+
+    assert response["imageUrl"].startswith("data:image/png;base64,")
+    assert response["cached"] is False
+    assert len(image_model) == 1
@@ -0,0 +1,143 @@
+import asyncio
+import base64
+import json
+import types
+
+import pytest
+
+import gemini_service
+import moderation
+from models import ModerationRecord
+from schemas import ModerationResponse, StepImageResponse
+
+pytestmark = pytest.mark.anyio
+
+
+def _image(label: str) -> str:
+    return base64.b64encode(f"image-{label}".encode()).decode()
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    """Replace the batched Gemini call; records each batch it receives."""
+    calls: list[list[bytes]] = []
+
+    def fake_moderate_images(images):
+        calls.append(images)
+        return [ModerationResponse(safe=b"bad" not in image, reason=None) for image in images]
+
+    monkeypatch.setattr(gemini_service, "moderate_images", fake_moderate_images)
+    return calls
+
+
+async def test_concurrent_images_share_one_model_call(model_calls):
+    photos = [_image("a"), _image("b"), _image("bad"), _image("a")]
+
+    results = await asyncio.gather(*(moderation.moderate(photo) for photo in photos))
+
+    assert [result.safe for result in results] == [True, True, False, True]
+    assert len(model_calls) == 1
+    # The duplicate image is sent once.
+    assert len(model_calls[0]) == 3
+
+
+async def test_verdict_is_persisted_by_hash(model_calls, db):
+    await moderation.moderate(_image("a"))
+    moderation._verdict_cache.clear()
+
+    # Same bytes as a data URL: served from the table, not the model.
+    result = await moderation.moderate("data:image/jpeg;base64," + _image("a"))
+
+    assert result.safe
+    assert len(model_calls) == 1
+    assert db.query(ModerationRecord).count() == 1
+
+
+async def test_model_failure_fails_closed_and_is_not_stored(monkeypatch, db):
+    def failing(images):
+        raise TimeoutError("upstream timed out")
+
+    monkeypatch.setattr(gemini_service, "moderate_images", failing)
+
+    result = await moderation.moderate(_image("a"))
+
+    assert not result.safe
+    assert result.reason == moderation.UNAVAILABLE_REASON
+    assert db.query(ModerationRecord).count() == 0
+
+
+async def test_invalid_image_is_rejected_without_model_call(model_calls):
+    result = await moderation.moderate("not base64 at all!")
+
+    assert not result.safe
+    assert model_calls == []
+
+
+async def test_only_text_only_generations_are_allowlisted(client, monkeypatch, model_calls):
+    generated = "data:image/png;base64," + _image("generated")
+
+    async def fake_generate(*args, **kwargs):
+        return StepImageResponse(imageUrl=generated)
+
+    monkeypatch.setattr(gemini_service, "generate_step_image", fake_generate)
+    body = {"objectName": "Lamp", "stepDescription": "Unscrew", "idealView": "Front"}
+
+    await client.post("/gemini/generate-step-image", json={**body, "referenceImageBase64": _image("photo")})
+    await moderation.moderate(generated)
+    assert len(model_calls) == 1
+
+    moderation._verdict_cache.clear()
+    generated = "data:image/png;base64," + _image("text-only")
+    await client.post("/gemini/generate-step-image", json=body)
+    await moderation.moderate(generated)
+    assert len(model_calls) == 1
+
+
+def _fake_text_client(monkeypatch, response_entries: list[dict]) -> list:
+    """Stub the text client; returns the list that receives each request's contents."""
+    requests = []
+
+    def generate_content(**kwargs):
+        requests.append(kwargs["contents"])
+        return types.SimpleNamespace(text=json.dumps(response_entries))
+
+    client = types.SimpleNamespace(models=types.SimpleNamespace(generate_content=generate_content))
+    monkeypatch.setattr(gemini_service, "get_text_client", lambda: client)
+    return requests
+
+
+def test_batch_labels_each_image(monkeypatch):
+    requests = _fake_text_client(monkeypatch, [])
+
+    gemini_service.moderate_images([b"first", b"second"])
+
+    contents = requests[0]
+    assert contents[0] == "Image 0:"
+    assert contents[1].inline_data.data == b"first"
+    assert contents[2] == "Image 1:"
+    assert contents[3].inline_data.data == b"second"
+
+
+def test_out_of_order_verdicts_map_back_by_label(monkeypatch):
+    _fake_text_client(monkeypatch, [
+        {"index": 2, "safe": False, "reason": "gore"},
+        {"index": 0, "safe": True, "reason": None},
+        {"index": 1, "safe": True, "reason": None},
+    ])
+
+    verdicts = gemini_service.moderate_images([b"a", b"b", b"c"])
+
+    assert [verdict.safe for verdict in verdicts] == [True, True, False]
+    assert verdicts[2].reason == "gore"
+
+
+def test_missing_or_duplicate_labels_are_left_undecided(monkeypatch):
+    _fake_text_client(monkeypatch, [
+        {"index": 0, "safe": True, "reason": None},
+        {"index": 0, "safe": False, "reason": "duplicate"},
+        {"index": 7, "safe": True, "reason": None},
+    ])
+
+    verdicts = gemini_service.moderate_images([b"a", b"b"])
+
+    assert verdicts == [None, None]
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import repair_transfer
+from conftest import make_repair
+from models import Repair
+
+pytestmark = pytest.mark.anyio
+
+
+def _step(number: int, image: str | None = None) -> dict:
+    return {
+        "stepNumber": number,
+        "instruction": f"Step {number}",
+        "visualDescription": "Close-up",
+        "generatedImageUrl": image
+    }
+
+
+async def test_round_trip_without_images_keeps_target_images(client):
+    repair = make_repair("r1", idealViewImageUrl="IDEAL", steps=[_step(1, "GEN")])
+    await client.post("/repairs/", json=repair)
+
+    export = await client.get("/repairs/export")
+    assert "GEN" not in export.text
+    response = await client.post("/repairs/import", content=export.text)
+
+    assert response.json() == {"imported": 1}
+    restored = (await client.get("/repairs/r1")).json()
+    assert restored["steps"][0]["generatedImageUrl"] == "GEN"
+    assert restored["userPhotoUrl"] == repair["userPhotoUrl"]
+    assert restored["idealViewImageUrl"] == "IDEAL"
+
+
+async def test_round_trip_with_images_into_empty_database(client, db):
+    await client.post("/repairs/", json=make_repair("r1", steps=[_step(1, "GEN")]))
+    export = (await client.get("/repairs/export?include_images=true")).text
+    db.query(Repair).delete()
+    db.commit()
+
+    await client.post("/repairs/import", content=export)
+
+    restored = (await client.get("/repairs/r1")).json()
+    assert restored["steps"][0]["generatedImageUrl"] == "GEN"
+    assert restored["userPhotoUrl"] == make_repair("r1")["userPhotoUrl"]
+
+
+async def test_nullable_columns_round_trip(client, db):
+    await client.post("/repairs/", json=make_repair("r1"))
+    row = db.get(Repair, "r1")
+    row.ideal_view_instruction = None
+    row.tools_needed = None
+    db.commit()
+
+    export = (await client.get("/repairs/export")).text
+    response = await client.post("/repairs/import", content=export)
+
+    assert response.status_code == 200
+    assert json.loads(export)["idealViewInstruction"] is None
+
+
+async def test_mixed_batch_and_repeated_ids(db):
+    lines = [
+        json.dumps({**make_repair("a"), "objectName": "first"}),
+        json.dumps({k: v for k, v in make_repair("b").items() if k != "userPhotoUrl"}),
+        json.dumps({**make_repair("a"), "objectName": "second"}),
+    ]
+
+    imported = repair_transfer.import_lines(db, lines, batch_size=10)
+
+    assert imported == 3
+    assert db.get(Repair, "a").object_name == "second"
+    assert db.get(Repair, "b").user_photo_url == ""
+
+
+async def test_invalid_line_reports_line_number(client):
+    body = json.dumps(make_repair("ok")) + "\n{broken\n"
+
+    response = await client.post("/repairs/import", content=body)
+
+    assert response.status_code == 400
+    assert "line 2" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("batch_size", [0, -1, 10001])
+async def test_batch_size_is_validated(client, batch_size):
+    export = await client.get(f"/repairs/export?batch_size={batch_size}")
+    imported = await client.post(f"/repairs/import?batch_size={batch_size}", content="")
+
+    assert export.status_code == 422
+    assert imported.status_code == 422
+
+
+async def test_export_streams_in_batches(client, db):
+    for i in range(5):
+        await client.post("/repairs/", json=make_repair(f"r{i}", timestamp=float(i)))
+    progress: list[int] = []
+
+    lines = list(repair_transfer.iter_export_lines(db, batch_size=2, on_progress=progress.append))
+
+    assert [json.loads(line)["repairId"] for line in lines] == [f"r{i}" for i in range(5)]
+    assert progress == [2, 4, 5]
+
+
+async def test_import_reassembles_lines_split_across_chunks(client, db):
+    body = "".join(json.dumps(make_repair(f"r{i}")) + "\n" for i in range(3)).encode()
+
+    async def tiny_chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    response = await client.post("/repairs/import", content=tiny_chunks())
+
+    assert response.json() == {"imported": 3}
+    assert {repair.repair_id for repair in db.query(Repair)} == {"r0", "r1", "r2"}
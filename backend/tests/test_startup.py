@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+COLD_IMPORT = (
+    "import sys; import main; "
+    "print(sorted(name for name in sys.modules if name.startswith('google.genai')))"
+)
+
+
+def test_importing_app_skips_sdk_and_database(tmp_path):
+    db_path = tmp_path / "cold.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+    assert not db_path.exists()
@@ -6,6 +6,24 @@
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
+// Retries for requests shed by the backend's admission control (503).
+const MAX_SHED_RETRIES = 2;
+const MAX_RETRY_AFTER_SECONDS = 30;
+
+/** POST JSON, waiting out `Retry-After` when the backend sheds the request. */
+async function postWithRetry(path: string, body: unknown): Promise<Response> {
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(`${API_BASE_URL}${path}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        if (response.status !== 503 || attempt >= MAX_SHED_RETRIES) return response;
+        const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+        await new Promise(resolve => setTimeout(resolve, Math.min(retryAfter, MAX_RETRY_AFTER_SECONDS) * 1000));
+    }
+}
+
 export const apiService = {
     // ============ Gemini AI Endpoints ============
 
@@ -37,11 +55,10 @@ export const apiService = {
         referenceImageBase64?: string,
         shouldHighlight: boolean = false
     ): Promise<string | null> {
-        const response = await fetch(`${API_BASE_URL}/gemini/generate-step-image`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ objectName, stepDescription, idealView, referenceImageBase64, shouldHighlight })
-        });
+        const response = await postWithRetry(
+            '/gemini/generate-step-image',
+            { objectName, stepDescription, idealView, referenceImageBase64, shouldHighlight }
+        );
         if (!response.ok) return null;
         const data = await response.json();
         return data.imageUrl;
@@ -71,7 +88,7 @@ export const apiService = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ photoBase64 })
         });
-        if (!response.ok) return { safe: true, reason: null };
+        if (!response.ok) return { safe: false, reason: 'Moderation is temporarily unavailable. Please try again.' };
         return response.json();
     },
 